@@ -0,0 +1,360 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import mean_absolute_error, r2_score
+
+CACHE_DIR = '.forecast_cache'
+MIN_TRAINING_DAYS = 21
+LAG_DAYS = 7
+HOLDOUT_DAYS = 7
+INITIAL_TREES = 200
+TREES_PER_UPDATE = 25
+MAX_TREES = 500
+MAX_VERSIONS_PER_SCOPE = 5
+CALENDAR_COLUMNS = ['day_index', 'day_of_week', 'is_weekend', 'day_of_month']
+LAG_COLUMNS = ['lag_1', 'lag_7', 'rolling_mean_7']
+
+
+@dataclass
+class ForecastBundle:
+    """Fitted forecasting models together with the data they were trained on"""
+    scope_key: str
+    data_version: str
+    start_date: pd.Timestamp
+    last_date: pd.Timestamp
+    branches: list
+    feature_columns: list
+    models: dict
+    metrics: dict = field(default_factory=dict)
+    hourly_share: pd.DataFrame = None
+    warm_started: bool = False
+
+
+def aggregate_revenue(df):
+    """Aggregates transactions into daily revenue per branch and hourly revenue shares"""
+    daily = df.groupby(['Date', 'Branch'])['Total'].sum().unstack('Branch').sort_index()
+    full_range = pd.date_range(daily.index.min(), daily.index.max(), freq='D')
+    daily = daily.reindex(full_range).fillna(0.0)
+    daily.index.name = 'Date'
+    daily = daily.reindex(sorted(daily.columns), axis=1)
+
+    hourly = df.pivot_table(values='Total', index='Branch', columns='hour', aggfunc='sum').fillna(0.0)
+    hourly_share = hourly.div(hourly.sum(axis=1), axis=0)
+    return daily, hourly_share
+
+
+def scope_key(branches, cities, start_date):
+    """Identifies a filter scope independently of how many days of data it covers"""
+    payload = json.dumps({
+        'branches': sorted(str(b) for b in branches),
+        'cities': sorted(str(c) for c in cities),
+        'start_date': str(pd.Timestamp(start_date).date())
+    })
+    return hashlib.sha1(payload.encode()).hexdigest()[:12]
+
+
+def data_version(daily):
+    """Hashes the aggregated daily revenue so identical data maps to the same models"""
+    hashed = pd.util.hash_pandas_object(daily, index=True).to_numpy()
+    header = ','.join(map(str, daily.columns)).encode()
+    return hashlib.sha1(header + hashed.tobytes()).hexdigest()[:16]
+
+
+def build_features(daily, start_date=None):
+    """Builds the long-format feature matrix for every branch/day from the wide daily revenue frame"""
+    if start_date is None:
+        start_date = daily.index[0]
+    previous = daily.shift(1)
+    frames = {
+        'revenue': daily,
+        'lag_1': previous,
+        'lag_7': daily.shift(LAG_DAYS),
+        'rolling_mean_7': previous.rolling(LAG_DAYS).mean()
+    }
+    long = pd.DataFrame({
+        'Date': np.repeat(daily.index.to_numpy(), len(daily.columns)),
+        'Branch': np.tile(daily.columns.to_numpy(), len(daily))
+    })
+    for name, frame in frames.items():
+        long[name] = frame.to_numpy(dtype=float).ravel()
+
+    long['day_index'] = (long['Date'] - pd.Timestamp(start_date)).dt.days
+    long['day_of_week'] = long['Date'].dt.dayofweek
+    long['is_weekend'] = long['day_of_week'].isin([5, 6]).astype(int)
+    long['day_of_month'] = long['Date'].dt.day
+
+    branch_dummies = pd.get_dummies(long['Branch'], prefix='branch', dtype=int)
+    branch_dummies = branch_dummies.reindex(sorted(f'branch_{b}' for b in daily.columns), axis=1, fill_value=0)
+    return pd.concat([long, branch_dummies], axis=1)
+
+
+def _training_set(daily, start_date, feature_columns):
+    features = build_features(daily, start_date).dropna(subset=LAG_COLUMNS + ['revenue'])
+    return features[feature_columns].to_numpy(dtype=float), features['revenue'].to_numpy(dtype=float)
+
+
+def _feature_columns(branches):
+    return CALENDAR_COLUMNS + LAG_COLUMNS + sorted(f'branch_{b}' for b in branches)
+
+
+def _new_models():
+    return {
+        'Linear Regression': LinearRegression(),
+        'Random Forest': RandomForestRegressor(
+            n_estimators=INITIAL_TREES,
+            min_samples_leaf=2,
+            warm_start=True,
+            random_state=42,
+            n_jobs=-1
+        )
+    }
+
+
+def holdout_metrics(daily, start_date, feature_columns):
+    """Scores freshly fitted models on the last `HOLDOUT_DAYS` days after training on the days before them"""
+    features = build_features(daily, start_date).dropna(subset=LAG_COLUMNS + ['revenue'])
+    is_holdout = features['Date'] > daily.index[-1 - HOLDOUT_DAYS]
+    train, test = features[~is_holdout], features[is_holdout]
+    X_train, y_train = train[feature_columns].to_numpy(dtype=float), train['revenue'].to_numpy(dtype=float)
+    X_test, y_test = test[feature_columns].to_numpy(dtype=float), test['revenue'].to_numpy(dtype=float)
+
+    metrics = {}
+    for name, model in _new_models().items():
+        predictions = model.fit(X_train, y_train).predict(X_test)
+        metrics[name] = {
+            'R²': float(r2_score(y_test, predictions)),
+            'MAE': float(mean_absolute_error(y_test, predictions)),
+            'R² type': f'Last {HOLDOUT_DAYS} days holdout'
+        }
+    return metrics
+
+
+def fit_bundle(daily, hourly_share, key, version):
+    """Trains both forecasting models from scratch on the full daily history"""
+    if len(daily) < MIN_TRAINING_DAYS:
+        raise ValueError(f"At least {MIN_TRAINING_DAYS} days of data are needed to train a forecast")
+
+    branches = list(daily.columns)
+    feature_columns = _feature_columns(branches)
+    X, y = _training_set(daily, daily.index[0], feature_columns)
+    models = {name: model.fit(X, y) for name, model in _new_models().items()}
+
+    return ForecastBundle(
+        scope_key=key,
+        data_version=version,
+        start_date=daily.index[0],
+        last_date=daily.index[-1],
+        branches=branches,
+        feature_columns=feature_columns,
+        models=models,
+        metrics=holdout_metrics(daily, daily.index[0], feature_columns),
+        hourly_share=hourly_share
+    )
+
+
+def update_bundle(bundle, daily, hourly_share, version):
+    """Warm-starts an existing bundle with the days that arrived since it was trained"""
+    X, y = _training_set(daily, bundle.start_date, bundle.feature_columns)
+
+    forest = bundle.models['Random Forest']
+    if forest.n_estimators + TREES_PER_UPDATE > MAX_TREES:
+        return fit_bundle(daily, hourly_share, bundle.scope_key, version)
+
+    # Linear regression has a closed-form fit, so refitting it is as cheap as an update
+    bundle.models['Linear Regression'] = LinearRegression().fit(X, y)
+    forest.n_estimators += TREES_PER_UPDATE
+    forest.fit(X, y)
+
+    bundle.data_version = version
+    bundle.last_date = daily.index[-1]
+    bundle.metrics = holdout_metrics(daily, bundle.start_date, bundle.feature_columns)
+    bundle.hourly_share = hourly_share
+    bundle.warm_started = True
+    return bundle
+
+
+def forecast(bundle, daily, horizon):
+    """Recursively forecasts daily revenue per branch for the next `horizon` days"""
+    history = daily.reindex(columns=bundle.branches).copy()
+    future_dates = pd.date_range(history.index[-1] + pd.Timedelta(days=1), periods=horizon, freq='D')
+    predictions = {name: [] for name in bundle.models}
+
+    for name, model in bundle.models.items():
+        extended = history.copy()
+        for date in future_dates:
+            extended.loc[date] = np.nan
+            window = extended.iloc[-(LAG_DAYS + 1):]
+            step = build_features(window, bundle.start_date).iloc[-len(bundle.branches):]
+            values = np.clip(model.predict(step[bundle.feature_columns].to_numpy(dtype=float)), 0, None)
+            extended.loc[date] = values
+            predictions[name].append(pd.Series(values, index=bundle.branches, name=date))
+
+    result = pd.concat(
+        {name: pd.DataFrame(rows) for name, rows in predictions.items()},
+        names=['Model', 'Date']
+    )
+    result.columns.name = 'Branch'
+    return result
+
+
+def forecast_hourly(bundle, daily_forecast):
+    """Splits a single day's branch forecast across hours using each branch's historical hourly share"""
+    share = bundle.hourly_share.reindex(index=daily_forecast.index).fillna(0.0)
+    return share.mul(daily_forecast, axis=0).sum(axis=0)
+
+
+def feature_importances(bundle):
+    """Returns random forest importances alongside linear regression coefficients"""
+    return pd.DataFrame({
+        'Random Forest Importance': bundle.models['Random Forest'].feature_importances_,
+        'Linear Regression Coefficient': bundle.models['Linear Regression'].coef_
+    }, index=bundle.feature_columns).sort_values('Random Forest Importance', ascending=False)
+
+
+class ForecastEngine:
+    """Trains forecasting models in a background pool and persists them per data version and filter scope"""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_workers=2):
+        self.cache_dir = cache_dir
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='forecast')
+        self._lock = threading.Lock()
+        self._jobs = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def submit(self, df, key):
+        """Returns a future resolving to a trained bundle, reusing cached or in-flight work when possible
+
+        Bundles already on disk are returned as completed futures, so callers can
+        poll `done()` on every rerun without waiting on the pool.
+        """
+        daily, hourly_share = aggregate_revenue(df)
+        version = data_version(daily)
+        job_key = (key, version)
+
+        with self._lock:
+            job = self._jobs.get(job_key)
+            if job is not None:
+                if job.done():
+                    # A failed job is reported once and retried on the next request
+                    del self._jobs[job_key]
+                return job, daily
+
+        cached = self._load(self._path(key, version))
+        if cached is not None:
+            return self._completed(result=cached), daily
+        if len(daily) < MIN_TRAINING_DAYS:
+            return self._completed(exception=ValueError(
+                f"At least {MIN_TRAINING_DAYS} days of data are needed to train a forecast"
+            )), daily
+
+        with self._lock:
+            job = self._jobs.get(job_key)
+            if job is None:
+                job = self._executor.submit(self._train, daily, hourly_share, key, version)
+                self._jobs[job_key] = job
+                submitted = True
+            else:
+                submitted = False
+
+        # Only in-flight and failed jobs are tracked; finished bundles are served from the disk cache
+        if submitted:
+            job.add_done_callback(lambda finished: self._forget(job_key, finished))
+        return job, daily
+
+    def _completed(self, result=None, exception=None):
+        job = Future()
+        if exception is not None:
+            job.set_exception(exception)
+        else:
+            job.set_result(result)
+        return job
+
+    def _forget(self, job_key, job):
+        if job.cancelled() or job.exception() is not None:
+            return
+        with self._lock:
+            if self._jobs.get(job_key) is job:
+                del self._jobs[job_key]
+
+    def _path(self, key, version):
+        return os.path.join(self.cache_dir, f'{key}_{version}.joblib')
+
+    def _train(self, daily, hourly_share, key, version):
+        path = self._path(key, version)
+        cached = self._load(path)
+        if cached is not None:
+            return cached
+
+        base = self._latest_prefix_bundle(daily, key)
+        if base is not None:
+            bundle = update_bundle(base, daily, hourly_share, version)
+        else:
+            bundle = fit_bundle(daily, hourly_share, key, version)
+
+        self._dump(bundle, path)
+        self._prune(key)
+        return bundle
+
+    def _load(self, path):
+        """Loads a cached bundle, treating missing, truncated or incompatible files as a cache miss"""
+        try:
+            return joblib.load(path)
+        except Exception:
+            return None
+
+    def _dump(self, bundle, path):
+        """Writes a bundle atomically so concurrent readers never see a partial file"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        os.close(fd)
+        try:
+            joblib.dump(bundle, tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _scope_files(self, key):
+        """Lists cached bundles for a scope as (mtime, path), newest first, skipping files removed concurrently"""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(f'{key}_') and name.endswith('.joblib'):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    files.append((os.path.getmtime(path), path))
+                except OSError:
+                    continue
+        return sorted(files, reverse=True)
+
+    def _latest_prefix_bundle(self, daily, key):
+        """Finds the most recent cached bundle for this scope whose training data is a prefix of `daily`"""
+        for _, path in self._scope_files(key):
+            bundle = self._load(path)
+            if bundle is None:
+                continue
+            if bundle.start_date != daily.index[0] or bundle.last_date >= daily.index[-1]:
+                continue
+            if list(daily.columns) != bundle.branches:
+                continue
+            if data_version(daily.loc[:bundle.last_date]) == bundle.data_version:
+                return bundle
+        return None
+
+    def _prune(self, key):
+        for _, path in self._scope_files(key)[MAX_VERSIONS_PER_SCOPE:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
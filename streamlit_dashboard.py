@@ -18,6 +18,7 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+import sales_forecasting
 warnings.filterwarnings('ignore')
 
 st.set_page_config(
@@ -79,6 +80,11 @@ def load_data():
     
     return df
 
+@st.cache_resource
+def get_forecast_engine():
+    """Shares one background training pool and model cache across sessions and reruns"""
+    return sales_forecasting.ForecastEngine()
+
 def generate_pdf_report(df_filtered, date_range, branches, cities):
     """Creates a comprehensive PDF report with analysis results and insights"""
     buffer = io.BytesIO()
@@ -351,7 +357,11 @@ def main():
                     st.error(f"❌ Error generating PDF report: {str(e)}")
                     st.info("💡 Make sure you have the required dependencies installed: `pip install reportlab`")
     
-    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📈 Overview", "📊 Statistical Analysis", "🔍 Customer Insights", "⏰ Time Analysis", "📋 Detailed Reports"])
+    if len(df_filtered) > 0:
+        forecast_scope = sales_forecasting.scope_key(branches, cities, df_filtered['Date'].min())
+        forecast_job, forecast_daily = get_forecast_engine().submit(df_filtered, forecast_scope)
+    
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["📈 Overview", "📊 Statistical Analysis", "🔍 Customer Insights", "⏰ Time Analysis", "📋 Detailed Reports", "🔮 Forecasting"])
     
     with tab1:
         st.subheader("💡 Key Business Insights")
@@ -666,6 +676,91 @@ def main():
             st.write(f"- Date range: {df_filtered['Date'].min()} to {df_filtered['Date'].max()}")
             st.write(f"- Total range: ${df_filtered['Total'].min():.2f} to ${df_filtered['Total'].max():.2f}")
             st.write(f"- Rating range: {df_filtered['Rating'].min():.1f} to {df_filtered['Rating'].max():.1f}")
+    
+    with tab6:
+        st.header("🔮 Sales Forecasting")
+        
+        if len(df_filtered) == 0:
+            st.info("ℹ️ No transactions match the current filters")
+        else:
+            bundle = None
+            if not forecast_job.done():
+                st.info("⏳ Forecast models are training in the background. Refresh once they are ready.")
+                st.button("🔄 Refresh Forecast")
+            else:
+                try:
+                    bundle = forecast_job.result()
+                except ValueError as e:
+                    st.warning(f"⚠️ {str(e)}")
+                except Exception as e:
+                    st.error(f"❌ Error training forecast models: {str(e)}")
+            
+            if bundle is not None:
+                if bundle.warm_started:
+                    st.caption(f"Models incrementally updated with data through {bundle.last_date.date()}")
+                else:
+                    st.caption(f"Models trained on data through {bundle.last_date.date()}")
+                
+                horizon = st.slider("Forecast horizon (days)", min_value=7, max_value=30, value=14)
+                forecast = sales_forecasting.forecast(bundle, forecast_daily, horizon)
+                
+                col1, col2 = st.columns(2)
+                for col, (model_name, metrics) in zip([col1, col2], bundle.metrics.items()):
+                    with col:
+                        st.metric(
+                            label=f"{model_name} R² ({metrics['R² type']})",
+                            value=f"{metrics['R²']:.3f}",
+                            delta=f"${forecast.loc[model_name].values.sum():,.2f} forecast revenue",
+                            delta_color="off"
+                        )
+                
+                st.subheader("📈 Daily Revenue Forecast")
+                history = forecast_daily.sum(axis=1).rename('Actual')
+                forecast_totals = forecast.sum(axis=1).unstack('Model')
+                fig = go.Figure()
+                fig.add_trace(go.Scatter(x=history.index, y=history.values, mode='lines', name='Actual'))
+                for model_name in forecast_totals.columns:
+                    fig.add_trace(go.Scatter(
+                        x=forecast_totals.index,
+                        y=forecast_totals[model_name],
+                        mode='lines',
+                        line=dict(dash='dash'),
+                        name=f"{model_name} Forecast"
+                    ))
+                fig.update_layout(title="Actual vs Forecast Daily Revenue", xaxis_title="Date", yaxis_title="Revenue ($)")
+                st.plotly_chart(fig, use_container_width=True)
+                
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    st.subheader("🏪 Forecast by Branch")
+                    branch_forecast = forecast.groupby(level='Model').sum().T.round(2)
+                    st.dataframe(branch_forecast, use_container_width=True)
+                
+                with col2:
+                    st.subheader("🕐 Next Day Forecast by Hour")
+                    next_day = forecast.loc['Random Forest'].iloc[0]
+                    hourly_forecast = sales_forecasting.forecast_hourly(bundle, next_day)
+                    fig = px.bar(
+                        x=hourly_forecast.index,
+                        y=hourly_forecast.values,
+                        title=f"Random Forest Forecast for {next_day.name.date()}",
+                        labels={'x': 'Hour', 'y': 'Revenue ($)'}
+                    )
+                    st.plotly_chart(fig, use_container_width=True)
+                
+                st.subheader("🧠 Feature Importances")
+                importances = sales_forecasting.feature_importances(bundle)
+                fig = px.bar(
+                    x=importances['Random Forest Importance'],
+                    y=importances.index,
+                    orientation='h',
+                    title="Random Forest Feature Importances",
+                    labels={'x': 'Importance', 'y': 'Feature'}
+                )
+                fig.update_layout(yaxis={'categoryorder': 'total ascending'})
+                st.plotly_chart(fig, use_container_width=True)
+                st.dataframe(importances.round(4), use_container_width=True)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,124 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+
+import sales_forecasting
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Walmart_Sales_Data.csv')
+
+
+@pytest.fixture(scope='module')
+def sales():
+    """Loads the sales data with the columns the forecasting engine needs"""
+    df = pd.read_csv(DATA_PATH)
+    df['Date'] = pd.to_datetime(df['Date'])
+    df['hour'] = pd.to_datetime(df['Time'], format='%H:%M:%S').dt.hour
+    return df
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return sales_forecasting.ForecastEngine(cache_dir=str(tmp_path))
+
+
+def train(engine, df, key):
+    job, daily = engine.submit(df, key)
+    return job.result(), daily
+
+
+def test_new_days_warm_start_cached_bundle(engine, sales):
+    key = sales_forecasting.scope_key(['A', 'B', 'C'], ['Yangon', 'Mandalay', 'Naypyitaw'], sales['Date'].min())
+
+    initial, _ = train(engine, sales[sales['Date'] <= '2019-02-28'], key)
+    assert not initial.warm_started
+    assert initial.models['Random Forest'].n_estimators == sales_forecasting.INITIAL_TREES
+
+    updated, daily = train(engine, sales, key)
+    assert updated.warm_started
+    assert updated.last_date == pd.Timestamp('2019-03-30')
+    assert updated.models['Random Forest'].n_estimators == (
+        sales_forecasting.INITIAL_TREES + sales_forecasting.TREES_PER_UPDATE
+    )
+
+    X, y = sales_forecasting._training_set(daily, updated.start_date, updated.feature_columns)
+    fresh = LinearRegression().fit(X, y)
+    np.testing.assert_allclose(updated.models['Linear Regression'].coef_, fresh.coef_)
+
+    cached, _ = train(engine, sales, key)
+    assert cached.data_version == updated.data_version
+    assert cached.models['Random Forest'].n_estimators == updated.models['Random Forest'].n_estimators
+
+
+def test_changed_history_retrains_from_scratch(engine, sales):
+    key = sales_forecasting.scope_key(['A', 'B', 'C'], ['Yangon', 'Mandalay', 'Naypyitaw'], sales['Date'].min())
+    train(engine, sales[sales['Date'] <= '2019-02-28'], key)
+
+    revised = sales.copy()
+    revised.loc[revised['Date'] == '2019-01-15', 'Total'] *= 2
+    bundle, _ = train(engine, revised, key)
+
+    assert not bundle.warm_started
+    assert bundle.models['Random Forest'].n_estimators == sales_forecasting.INITIAL_TREES
+
+
+def test_update_past_max_trees_refits(sales):
+    daily, hourly_share = sales_forecasting.aggregate_revenue(sales)
+    bundle = sales_forecasting.fit_bundle(daily, hourly_share, 'scope', 'v1')
+    bundle.models['Random Forest'].n_estimators = sales_forecasting.MAX_TREES
+
+    refit = sales_forecasting.update_bundle(bundle, daily, hourly_share, 'v2')
+    assert not refit.warm_started
+    assert refit.models['Random Forest'].n_estimators == sales_forecasting.INITIAL_TREES
+
+
+def test_finished_jobs_are_not_retained(engine, sales):
+    key = sales_forecasting.scope_key(['A'], ['Yangon'], sales['Date'].min())
+    train(engine, sales[sales['Branch'] == 'A'], key)
+    engine._executor.shutdown(wait=True)
+    assert engine._jobs == {}
+
+
+def test_metrics_use_time_ordered_holdout(engine, sales):
+    key = sales_forecasting.scope_key(['A', 'B', 'C'], ['Yangon', 'Mandalay', 'Naypyitaw'], sales['Date'].min())
+    train(engine, sales[sales['Date'] <= '2019-02-28'], key)
+    updated, daily = train(engine, sales, key)
+    assert updated.warm_started
+
+    fresh = sales_forecasting.fit_bundle(daily, updated.hourly_share, key, updated.data_version)
+    assert updated.metrics == fresh.metrics
+
+    features = sales_forecasting.build_features(daily, updated.start_date).dropna()
+    holdout_start = daily.index[-sales_forecasting.HOLDOUT_DAYS]
+    train_rows, test_rows = features[features['Date'] < holdout_start], features[features['Date'] >= holdout_start]
+    linear = LinearRegression().fit(train_rows[updated.feature_columns], train_rows['revenue'])
+    expected = linear.score(test_rows[updated.feature_columns], test_rows['revenue'])
+
+    metrics = updated.metrics['Linear Regression']
+    assert metrics['R²'] == pytest.approx(expected)
+    assert metrics['R² type'] == f'Last {sales_forecasting.HOLDOUT_DAYS} days holdout'
+    assert updated.metrics['Random Forest']['R² type'] == metrics['R² type']
+
+
+def test_unreadable_cache_file_is_retrained(engine, sales):
+    key = sales_forecasting.scope_key(['A', 'B', 'C'], ['Yangon', 'Mandalay', 'Naypyitaw'], sales['Date'].min())
+    daily, _ = sales_forecasting.aggregate_revenue(sales)
+    path = engine._path(key, sales_forecasting.data_version(daily))
+    with open(path, 'wb') as f:
+        f.write(b'not a joblib file')
+
+    bundle, _ = train(engine, sales, key)
+    assert not bundle.warm_started
+    assert joblib.load(path).data_version == bundle.data_version
+
+
+def test_cached_bundle_is_returned_without_waiting(engine, sales):
+    key = sales_forecasting.scope_key(['A', 'B', 'C'], ['Yangon', 'Mandalay', 'Naypyitaw'], sales['Date'].min())
+    first, _ = train(engine, sales, key)
+
+    job, _ = engine.submit(sales, key)
+    assert job.done()
+    assert job.result().data_version == first.data_version